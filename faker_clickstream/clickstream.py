@@ -1,9 +1,11 @@
-import hashlib
+import bisect
+import itertools
+import os
 import random
-import re
-import string
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from random import choice, randint
+from typing import Optional
 
 import numpy as np
 from faker.providers import BaseProvider
@@ -13,6 +15,86 @@ from faker_clickstream.ip import ip_list
 from faker_clickstream.mobile_phones import mobile_phones
 from faker_clickstream.user_agents import user_agents
 
+_UNIT_MULT = {
+    's': 1,
+    'm': 60,
+    'h': 3600,
+    'd': 86400
+}
+# Weighted event names, so that sessions work on local names and never mutate the shared event objects
+_EVT_NAMES = tuple(e['name'] for e in weighted_events)
+# Bit flag per event name, used to track the events of a session in a single integer mask
+_EVT_BIT = {e['name']: 1 << i for i, e in enumerate(weighted_events)}
+# Dependency mask per weighted event, and whether all (rather than any) of the dependencies are required
+_DEP_MASK = tuple(sum(_EVT_BIT[d] for d in set(e['dependsOn'])) for e in weighted_events)
+_DEP_ALL = tuple(e['dependencyFilter'] == 'all' for e in weighted_events)
+_COMPLETE_ORDER_RESET_MASK = _EVT_BIT['Checkout'] | _EVT_BIT['CheckoutAsGuest'] | _EVT_BIT['DecreaseQuantity']
+_QTY_VALS = (1, 2, 3, 4, 5)
+_QTY_CUM = (50, 70, 90, 95, 100)
+
+
+def _build_alias_table(weights):
+    """
+    Build a Walker alias table (Vose's construction) for constant time weighted sampling.
+
+    :param weights: Sequence of non-negative weights
+    :return: Tuple of (probability list, alias list)
+    """
+    n = len(weights)
+    total = float(sum(weights))
+    scaled = [w * n / total for w in weights]
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+    while small and large:
+        s = small.pop()
+        g = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] = (scaled[g] + scaled[s]) - 1.0
+        if scaled[g] < 1.0:
+            small.append(g)
+        else:
+            large.append(g)
+
+    # Remaining entries are 1.0 up to floating point error
+    return prob, alias
+
+
+def _alias_draw(prob, alias):
+    """
+    Draw an index from a Walker alias table.
+
+    :param prob: Probability list of the alias table
+    :param alias: Alias list of the alias table
+    :return: Sampled index
+    """
+    i = randint(0, len(prob) - 1)
+    return i if random.random() < prob[i] else alias[i]
+
+
+def _alias_draw_many(prob, alias, size):
+    """
+    Draw many indices from a Walker alias table in one vectorized call.
+
+    :param prob: Probability array of the alias table
+    :param alias: Alias array of the alias table
+    :param size: Number of indices to draw
+    :return: List of sampled indices
+    """
+    i = np.random.randint(0, len(prob), size=size)
+    return np.where(np.random.random(size) < prob[i], i, alias[i]).tolist()
+
+
+# Alias tables, computed once so that weighted draws take constant time
+_WEVT_PROB, _WEVT_ALIAS = _build_alias_table([e['popularity'] for e in weighted_events])
+_WEVT_PROB_ARR, _WEVT_ALIAS_ARR = np.array(_WEVT_PROB), np.array(_WEVT_ALIAS)
+_PHONE_PROB, _PHONE_ALIAS = _build_alias_table([p['popularity'] for p in mobile_phones])
+# Possible search queries per mobile phone
+_PHONE_QUERIES = tuple((p['model_name'], p['brand_name'], p['os']) for p in mobile_phones)
+
 
 class ClickstreamProvider(BaseProvider):
     """
@@ -48,7 +130,7 @@ class ClickstreamProvider(BaseProvider):
 
         :return: Event object (JSON)
         """
-        return random.choices(weighted_events, weights=[e['popularity'] for e in weighted_events], k=1)[0]
+        return weighted_events[_alias_draw(_WEVT_PROB, _WEVT_ALIAS)]
 
     def session_clickstream(self, rand_session_max_size: int = 25, max_product_code: int = 999999, max_order_id: int = 999999, max_user_id: int = 999999, start_time: str = "0s", a: float = 1.5):
         """
@@ -62,9 +144,29 @@ class ClickstreamProvider(BaseProvider):
         :param a: Shape parameter for Pareto distribution. Defaults to 1.5.
         :return: List of session events
         """
+        return list(self.iter_session_clickstream(
+            rand_session_max_size=rand_session_max_size,
+            max_product_code=max_product_code,
+            max_order_id=max_order_id,
+            max_user_id=max_user_id,
+            start_time=start_time,
+            a=a
+        ))
+
+    def iter_session_clickstream(self, rand_session_max_size: int = 25, max_product_code: int = 999999, max_order_id: int = 999999, max_user_id: int = 999999, start_time: str = "0s", a: float = 1.5):
+        """
+        Generate session clickstream events one at a time, without holding the whole session in memory.
+
+        :param rand_session_max_size: Max number of possible events in session. Defaults to 25.
+        :param max_product_code: Max value for product codes. Defaults to 999999.
+        :param max_order_id: Max value for order IDs. Defaults to 999999.
+        :param max_user_id: Max value for user IDs. Defaults to 999999.
+        :param start_time: Start time offset from current time (e.g., "-1d", "-1h", "+1m", "0s"). Defaults to "0s".
+        :param a: Shape parameter for Pareto distribution. Defaults to 1.5.
+        :return: Iterator of session events
+        """
 
         # Initialize static session values
-        session_events = []
         user_id = _get_user_id(end=max_user_id)
         user_agent = self.user_agent()
         session_id = _get_session_id()
@@ -74,97 +176,172 @@ class ClickstreamProvider(BaseProvider):
 
         # Parse start_time and calculate the base event time
         start_offset_seconds = _parse_time_interval(start_time)
-        current_event_time = datetime.now() + timedelta(seconds=start_offset_seconds)
+        base_time = datetime.now() + timedelta(seconds=start_offset_seconds)
+
+        # Draw all event time offsets and weighted events of the session at once.
+        # Event times are kept as float seconds from the naive base time, accumulated from the Pareto distributed
+        # offsets, rather than as POSIX timestamps that fail for dates before 1970 on some platforms. Shifting
+        # random.paretovariate by one gives the same (Lomax) distribution as numpy.random.pareto, without numpy's
+        # per call overhead that dominates for session sized draws.
+        if a <= 0:
+            raise ValueError(f"Invalid Pareto shape parameter: {a}. Expected a > 0")
+        paretovariate = random.paretovariate
+        event_offsets = list(itertools.accumulate(itertools.chain(
+            (0.0,), [paretovariate(a) - 1.0 for _ in range(random_session_size - 1)]
+        )))
+        event_indices = _alias_draw_many(_WEVT_PROB_ARR, _WEVT_ALIAS_ARR, random_session_size)
 
         # Keep track of unique values in a session
-        unique_session_events = set()
-        product_codes = set()
+        session_events_mask = 0
+        # Cart product codes, as a list for O(1) random deletion and a set for membership
+        product_codes = []
+        product_codes_set = set()
+        date_ordinal = None
+        date_part = None
+
+        # Bind frequently used globals to locals for the event loop
+        evt_names = _EVT_NAMES
+        evt_bit = _EVT_BIT
+        dep_masks = _DEP_MASK
+        dep_all = _DEP_ALL
 
         for s in range(random_session_size):
-            # Format current event time
-            event_time = _format_time(current_event_time)
-
-            # Generate next event time offset using Pareto distribution
-            if s < random_session_size - 1:
-                pareto_offset = np.random.pareto(a)
-                current_event_time = current_event_time + timedelta(seconds=pareto_offset)
+            # Format current event time like 28/03/2022 23:22:15.360252. The date part rarely changes within a
+            # session, so it is only formatted again when the day changes.
+            t = base_time + timedelta(seconds=event_offsets[s])
+            if t.toordinal() != date_ordinal:
+                date_ordinal = t.toordinal()
+                date_part = t.strftime("%d/%m/%Y ")
+            event_time = "%s%02d:%02d:%02d.%06d" % (date_part, t.hour, t.minute, t.second, t.microsecond)
 
             # Fetch weighted event
-            event = self.weighted_event()
+            event_index = event_indices[s]
+            name = evt_names[event_index]
 
-            if (event['name'] == 'Login' and event['name'] in unique_session_events) \
-                    or (event['name'] == 'CheckoutAsGuest' and user_id != 0):
+            if (name == 'Login' and session_events_mask & evt_bit['Login']) \
+                    or (name == 'CheckoutAsGuest' and user_id != 0):
                 # If user ID is not 0, discard CheckoutAsGuest event
                 # or Login exists in session, discard Login event
                 # Add a mock Search event
-                event['name'] = 'Search'
+                name = 'Search'
 
-            if event['name'] == 'Login' and user_id == 0:
+            if name == 'Login' and user_id == 0:
                 # If user id is -1 and Login event, regenerate user ID.
                 user_id = _get_user_id(start=1, end=max_user_id)
 
-            if (event['name'] == 'Login' and user_id != 0) or (event['name'] == 'Logout' and user_id == 0):
+            if (name == 'Login' and user_id != 0) or (name == 'Logout' and user_id == 0):
                 # Add a mock Search event
-                event['name'] = 'Search'
+                name = 'Search'
 
             # Keep track of unique events in session
-            unique_session_events.add(event['name'])
+            session_events_mask |= evt_bit[name]
 
             # Handle event dependencies
-            if len(event['dependsOn']):
-                list_check = [d in unique_session_events for d in event['dependsOn']]
-                if event['dependencyFilter'] == 'all':
-                    f = all(list_check)
+            dep_mask = dep_masks[event_index]
+            if dep_mask:
+                if dep_all[event_index]:
+                    f = session_events_mask & dep_mask == dep_mask
                 else:
-                    f = any(list_check)
+                    f = session_events_mask & dep_mask != 0
                 if not f:
                     # Add a mock Search event
-                    event['name'] = 'Search'
+                    name = 'Search'
 
             # If CompleteOrder, remove some events from the unique list to reoccur.
-            if event['name'] == 'CompleteOrder':
-                if 'Checkout' in unique_session_events:
-                    unique_session_events.remove('Checkout')
-                if 'CheckoutAsGuest' in unique_session_events:
-                    unique_session_events.remove('CheckoutAsGuest')
-                if 'DecreaseQuantity' in unique_session_events:
-                    unique_session_events.remove('DecreaseQuantity')
-
-            # Fill metadata object conditionally
-            metadata = {}
-            if event['name'] == 'Search':
-                sample_product = _get_weighted_mobile_phone()
-                metadata['query'] = choice(
-                    (sample_product['model_name'], sample_product['brand_name'], sample_product['os'])
-                )
-
-            if event['name'] in ('AddToCart', 'IncreaseQuantity'):
-                metadata['product_id'] = _get_product_code(max_product_code)
-                metadata['quantity'] = _get_quantity()
-                product_codes.add(metadata['product_id'])
-
-            if event['name'] == 'DeleteFromCart':
-                if len(product_codes):
-                    random_delete = choice(list(product_codes))
-                    product_codes.remove(random_delete)
-                    metadata['product_id'] = random_delete
-
-            if event['name'] == 'CheckOrderStatus':
-                metadata['order_id'] = _get_order_id(max_order_id)
+            if name == 'CompleteOrder':
+                session_events_mask &= ~_COMPLETE_ORDER_RESET_MASK
+
+            # Fill metadata object conditionally, building each one in a single dict display
+            if name == 'Search':
+                metadata = {'query': _get_search_query()}
+            elif name == 'AddToCart' or name == 'IncreaseQuantity':
+                product_id = _get_product_code(max_product_code)
+                metadata = {'product_id': product_id, 'quantity': _get_quantity()}
+                if product_id not in product_codes_set:
+                    product_codes_set.add(product_id)
+                    product_codes.append(product_id)
+            elif name == 'DeleteFromCart' and product_codes:
+                # Swap a random product code with the last one and pop it
+                i = randint(0, len(product_codes) - 1)
+                product_codes[i], product_codes[-1] = product_codes[-1], product_codes[i]
+                product_id = product_codes.pop()
+                product_codes_set.remove(product_id)
+                metadata = {'product_id': product_id}
+            elif name == 'CheckOrderStatus':
+                metadata = {'order_id': _get_order_id(max_order_id)}
+            else:
+                metadata = {}
 
             # Construct final event object
-            r = {
+            yield {
                 "ip": ip,
                 "user_id": user_id,
                 "user_agent": user_agent,
                 "session_id": session_id,
                 "event_time": event_time,
-                "event_name": event['name'],
+                "event_name": name,
                 "channel": channel_type,
                 "metadata": metadata
             }
-            session_events.append(r)
-        return session_events
+
+    def bulk_session_clickstream(self, n_sessions: int, workers: Optional[int] = None, chunk_size: int = 10000, seed: Optional[int] = None, **kwargs):
+        """
+        Generate many session clickstreams in parallel worker processes.
+
+        Under the spawn start method (the default on macOS and Windows) worker processes import the calling module, so
+        scripts must call this from within an `if __name__ == "__main__":` block.
+
+        :param n_sessions: Number of sessions to generate.
+        :param workers: Number of worker processes. Defaults to the number of CPUs.
+        :param chunk_size: Max number of sessions generated per worker task. Defaults to 10000.
+        :param seed: Seed from which independent random streams are derived for each task. Sessions generated with the
+            same seed, chunk_size and workers are identical, except for event times that are relative to the current
+            time. Defaults to None.
+        :param kwargs: Keyword arguments passed to `session_clickstream`.
+        :return: List of sessions, each a list of session events
+        """
+        workers = workers or os.cpu_count() or 1
+        chunks = _chunk_sizes(n_sessions, workers, chunk_size)
+        if not chunks:
+            return []
+        seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+
+        sessions = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            for chunk in executor.map(_session_clickstream_chunk, chunks, seeds, [kwargs] * len(chunks)):
+                sessions.extend(chunk)
+        return sessions
+
+
+def _chunk_sizes(n_sessions: int, workers: int, chunk_size: int):
+    """
+    Split sessions into chunks, so that every worker gets at least one chunk and no chunk exceeds chunk_size.
+
+    :param n_sessions: Number of sessions to generate.
+    :param workers: Number of worker processes.
+    :param chunk_size: Max number of sessions per chunk.
+    :return: List of chunk sizes
+    """
+    size = max(1, min(chunk_size, -(-n_sessions // workers)))
+    return [min(size, n_sessions - i) for i in range(0, n_sessions, size)]
+
+
+def _session_clickstream_chunk(n_sessions, seed_sequence, kwargs):
+    """
+    Generate a chunk of session clickstreams in a worker process, seeding the random number generators first so that
+    each chunk draws from an independent stream.
+
+    :param n_sessions: Number of sessions to generate.
+    :param seed_sequence: Seed sequence of the chunk.
+    :param kwargs: Keyword arguments passed to `session_clickstream`.
+    :return: List of sessions
+    """
+    state = seed_sequence.generate_state(4)
+    random.seed(int.from_bytes(state.tobytes(), 'little'))
+    np.random.seed(state)
+
+    provider = ClickstreamProvider(None)
+    return [provider.session_clickstream(**kwargs) for _ in range(n_sessions)]
 
 
 def _parse_time_interval(interval: str):
@@ -174,22 +351,14 @@ def _parse_time_interval(interval: str):
     :param interval: Time interval string (e.g., "-1d", "-1h", "+1m", "0s")
     :return: Offset in seconds
     """
-    match = re.match(r'^([+-]?)(\d+)([smhd])$', interval)
-    if not match:
+    sign = interval[:1]
+    value = interval[1:-1] if sign in ('+', '-') else interval[:-1]
+    unit = interval[-1:]
+    if not value.isdecimal() or unit not in _UNIT_MULT:
         raise ValueError(f"Invalid time interval format: {interval}. Expected format: [+/-]<number><unit> where unit is s/m/h/d")
 
-    sign, value, unit = match.groups()
-    value = int(value)
-
     # Convert to seconds
-    unit_multipliers = {
-        's': 1,
-        'm': 60,
-        'h': 3600,
-        'd': 86400
-    }
-
-    seconds = value * unit_multipliers[unit]
+    seconds = int(value) * _UNIT_MULT[unit]
 
     # Apply sign
     if sign == '-':
@@ -204,13 +373,7 @@ def _get_session_id():
 
     :return: Session ID string
     """
-    return hashlib.sha256(
-        ('%s%s%s' % (
-            datetime.now().strftime("%d/%m/%Y %H:%M:%S.%f"),
-            (''.join(random.choice(string.ascii_lowercase)) for _ in range(10)),
-            'faker_clickstream'
-        )).encode('utf-8')
-    ).hexdigest()
+    return '%064x' % random.getrandbits(256)
 
 
 def _get_product_code(max_value: int = 999999):
@@ -244,16 +407,6 @@ def _get_user_id(start: int = 0, end: int = 999999):
     return randint(start, end)
 
 
-def _format_time(t):
-    """
-    Format time to string.
-
-    :param t: Time object
-    :return: Time string in format like 28/03/2022 23:22:15.360252
-    """
-    return t.strftime("%d/%m/%Y %H:%M:%S.%f")
-
-
 def _get_quantity():
     """
     Get random product order quantity from 1 to 5. Values are given a weight, decreasing as the quantity number
@@ -261,16 +414,16 @@ def _get_quantity():
 
     :return: Product quantity number
     """
-    return random.choices([1, 2, 3, 4, 5], weights=[50, 20, 20, 5, 5], k=1)[0]
+    return _QTY_VALS[bisect.bisect(_QTY_CUM, random.random() * 100)]
 
 
-def _get_weighted_mobile_phone():
+def _get_search_query():
     """
-    Get mobile phone object according to popularity
+    Get search query (model name, brand name or OS) of a mobile phone picked according to popularity
 
-    :return: Mobile phone object
+    :return: Search query string
     """
-    return random.choices(mobile_phones, weights=[e['popularity'] for e in mobile_phones], k=1)[0]
+    return choice(_PHONE_QUERIES[_alias_draw(_PHONE_PROB, _PHONE_ALIAS)])
 
 
 def _get_ip():
@@ -20,3 +20,153 @@ def test_response_length(fake):
 def test_schema(fake):
     res = fake.session_clickstream()
     assert 'ip' in res[0]
+
+
+def test_alias_table():
+    from faker_clickstream.clickstream import _build_alias_table
+
+    weights = [85, 70, 55, 40, 0, 25]
+    prob, alias = _build_alias_table(weights)
+    n = len(weights)
+    recovered = [prob[i] / n for i in range(n)]
+    for i in range(n):
+        recovered[alias[i]] += (1.0 - prob[i]) / n
+    for r, w in zip(recovered, weights):
+        assert r == pytest.approx(w / sum(weights))
+
+
+def test_weighted_events_not_mutated(fake):
+    from faker_clickstream.event_constants import weighted_events
+
+    names = [e['name'] for e in weighted_events]
+    for _ in range(100):
+        fake.session_clickstream()
+    assert [e['name'] for e in weighted_events] == names
+
+
+def test_bulk_session_clickstream(fake):
+    res = fake.bulk_session_clickstream(5, workers=2, chunk_size=2, rand_session_max_size=10)
+    assert len(res) == 5
+    assert all(0 < len(session) <= 10 for session in res)
+
+
+@pytest.mark.parametrize('interval, seconds', [('0s', 0), ('-1d', -86400), ('+2h', 7200), ('15m', 900)])
+def test_parse_time_interval(interval, seconds):
+    from faker_clickstream.clickstream import _parse_time_interval
+
+    assert _parse_time_interval(interval) == seconds
+
+
+@pytest.mark.parametrize('interval', ['', 's', '-s', '1', '1x', '+-1s', '1.5s', '1_0s', ' 1s'])
+def test_parse_time_interval_invalid(interval):
+    from faker_clickstream.clickstream import _parse_time_interval
+
+    with pytest.raises(ValueError):
+        _parse_time_interval(interval)
+
+
+def test_iter_session_clickstream(fake):
+    res = fake.iter_session_clickstream(rand_session_max_size=10)
+    events = list(res)
+    assert 0 < len(events) <= 10
+    assert len({e['session_id'] for e in events}) == 1
+
+
+@pytest.mark.parametrize('n_sessions, workers, chunk_size, expected', [
+    (5000, 8, 10000, [625] * 8),
+    (10, 4, 10000, [3, 3, 3, 1]),
+    (25000, 2, 10000, [10000, 10000, 5000]),
+    (3, 8, 10000, [1, 1, 1]),
+    (0, 4, 10000, []),
+])
+def test_chunk_sizes(n_sessions, workers, chunk_size, expected):
+    from faker_clickstream.clickstream import _chunk_sizes
+
+    assert _chunk_sizes(n_sessions, workers, chunk_size) == expected
+
+
+def test_bulk_session_clickstream_seed(fake):
+    def without_time(sessions):
+        return [[{k: v for k, v in e.items() if k != 'event_time'} for e in session] for session in sessions]
+
+    first = fake.bulk_session_clickstream(6, workers=2, seed=1)
+    second = fake.bulk_session_clickstream(6, workers=2, seed=1)
+    assert without_time(first) == without_time(second)
+    assert without_time(first) != without_time(fake.bulk_session_clickstream(6, workers=2, seed=2))
+
+
+def test_delete_from_cart_no_duplicates(fake):
+    for _ in range(200):
+        cart = set()
+        for e in fake.session_clickstream(max_product_code=1):
+            product_id = e['metadata'].get('product_id')
+            if e['event_name'] in ('AddToCart', 'IncreaseQuantity'):
+                cart.add(product_id)
+            elif e['event_name'] == 'DeleteFromCart' and product_id is not None:
+                assert product_id in cart
+                cart.remove(product_id)
+
+
+def _event_times(session):
+    from datetime import datetime
+
+    return [datetime.strptime(e['event_time'], "%d/%m/%Y %H:%M:%S.%f") for e in session]
+
+
+def test_event_time_format(fake):
+    for _ in range(50):
+        times = _event_times(fake.session_clickstream(start_time='-1h'))
+        assert times == sorted(times)
+
+
+def test_event_time_crosses_midnight(fake):
+    from datetime import datetime, timedelta
+
+    crossed = False
+    for _ in range(200):
+        now = datetime.now()
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        seconds = max(int((midnight - now).total_seconds()) - 3, 0)
+        times = _event_times(fake.session_clickstream(rand_session_max_size=50, start_time=f'+{seconds}s'))
+        assert times == sorted(times)
+        if times[0].date() != times[-1].date():
+            crossed = True
+            break
+    assert crossed
+
+
+def test_event_time_before_epoch(fake):
+    times = _event_times(fake.session_clickstream(start_time='-30000d'))
+    assert times[0].year < 1970
+    assert times == sorted(times)
+
+
+@pytest.mark.parametrize('n_sessions, expected_workers', [(0, None), (3, 3), (20, 7), (24, 8)])
+def test_bulk_session_clickstream_pool_size(fake, monkeypatch, n_sessions, expected_workers):
+    import faker_clickstream.clickstream as clickstream
+
+    pool_sizes = []
+
+    class SerialExecutor:
+        def __init__(self, max_workers):
+            pool_sizes.append(max_workers)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def map(self, fn, *iterables):
+            return map(fn, *iterables)
+
+    monkeypatch.setattr(clickstream, 'ProcessPoolExecutor', SerialExecutor)
+    res = fake.bulk_session_clickstream(n_sessions, workers=8)
+    assert len(res) == n_sessions
+    assert pool_sizes == ([expected_workers] if expected_workers else [])
+
+
+@pytest.mark.parametrize('a', [0, -1])
+def test_invalid_pareto_shape(fake, a):
+    with pytest.raises(ValueError):
+        fake.session_clickstream(a=a)